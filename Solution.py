@@ -1,10 +1,23 @@
 from typing import List
+import concurrent.futures
+import functools
+import inspect
+import json
+import logging
+import logging.handlers
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
 import Utility.DBConnector as Connector
 from Utility.Status import Status
 from Utility.Exceptions import DatabaseException
 from Business.File import File
 from Business.RAM import RAM
 from Business.Disk import Disk
+import psycopg2
 from psycopg2 import sql
 
 
@@ -20,29 +33,415 @@ def mapToDisk(diskID: int, company: str, speed: int, free_space: int, cost: int)
     return Disk(diskID, company, speed, free_space, cost)
 
 
-def createTables():
-    conn = None
+# workload recording: when startRecording() is active every public call is
+# appended as one JSON line {"t", "f", "a", "k", "r"} (timestamp, function,
+# positional arguments, keyword arguments if any, result) and can be re-run
+# later with replayWorkload().
+RECORDED_FUNCTIONS = {}  # name -> undecorated function, filled by @publicFunction
+recordFile = None
+recordLock = threading.Lock()
+recordingSuppressed = threading.local()  # set by explainAnalyticQueries on its own thread
+
+
+def encodeValue(value):
+    if isinstance(value, Status):
+        return {"Status": value.name}
+    if isinstance(value, File):
+        return {"File": [value.getFileID(), value.getType(), value.getSize()]}
+    if isinstance(value, Disk):
+        return {"Disk": [value.getDiskID(), value.getCompany(), value.getSpeed(),
+                         value.getFreeSpace(), value.getCost()]}
+    if isinstance(value, RAM):
+        return {"RAM": [value.getRamID(), value.getCompany(), value.getSize()]}
+    if isinstance(value, (list, tuple)):
+        return [encodeValue(item) for item in value]
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    # e.g. the Decimal returned by AVG
+    return float(value)
+
+
+def decodeValue(value):
+    if isinstance(value, list):
+        return [decodeValue(item) for item in value]
+    if isinstance(value, dict):
+        if "Status" in value:
+            return Status[value["Status"]]
+        if "File" in value:
+            return File(*value["File"])
+        if "Disk" in value:
+            return Disk(*value["Disk"])
+        if "RAM" in value:
+            return RAM(*value["RAM"])
+    return value
+
+
+def startRecording(path: str):
+    global recordFile
+    stopRecording()
+    recordFile = open(path, "a", buffering=1)
+
+
+def stopRecording():
+    global recordFile
+    with recordLock:
+        if recordFile is not None:
+            recordFile.close()
+        recordFile = None
+
+
+def publicFunction(function=None, record: bool = True):
+    # every public call goes through here so profiling knows which function and
+    # arguments a query belongs to, and recording can log the call.
+    # used as @publicFunction or @publicFunction(record=False)
+    if function is None:
+        return lambda function: publicFunction(function, record)
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if recordFile is None and activeThreshold() is None:
+            return function(*args, **kwargs)
+        stack = callContext.__dict__.setdefault("stack", [])
+        stack.append((function, args, kwargs))
+        timestamp = time.time()
+        try:
+            result = function(*args, **kwargs)
+        finally:
+            stack.pop()
+        if record and recordFile is not None and not getattr(recordingSuppressed, "active", False):
+            entry = {
+                "t": timestamp,
+                "f": function.__name__,
+                "a": encodeValue(args),
+                "r": encodeValue(result),
+            }
+            if kwargs:
+                entry["k"] = {key: encodeValue(value) for key, value in kwargs.items()}
+            line = json.dumps(entry, separators=(",", ":"))
+            with recordLock:
+                if recordFile is not None:
+                    recordFile.write(line + "\n")
+        return result
+    wrapper.original = function
+    if record:
+        RECORDED_FUNCTIONS[function.__name__] = function
+    return wrapper
+
+
+# profiling: calls slower than profileThreshold seconds are written to a rotating
+# log with the public function, its arguments, the rendered SQL, timing and (for
+# single SELECT statements on read connections) the EXPLAIN (ANALYZE, BUFFERS)
+# output. writes are never re-run under ANALYZE.
+profileThreshold = None  # seconds, None disables profiling
+profileLogger = None
+profilingOverride = threading.local()  # threshold/capture of explainAnalyticQueries, this thread only
+callContext = threading.local()  # stack of the public calls in progress on this thread
+
+
+def enableProfiling(threshold: float, logPath: str = "slow_queries.log",
+                    maxBytes: int = 10 * 1024 * 1024, backupCount: int = 5):
+    global profileThreshold, profileLogger
+    logger = logging.getLogger("Solution.profiling")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+    logger.addHandler(logging.handlers.RotatingFileHandler(
+        logPath, maxBytes=maxBytes, backupCount=backupCount))
+    profileThreshold = threshold
+    profileLogger = logger
+
+
+def disableProfiling():
+    global profileThreshold, profileLogger
+    if profileLogger is not None:
+        for handler in list(profileLogger.handlers):
+            profileLogger.removeHandler(handler)
+            handler.close()
+    profileThreshold = None
+    profileLogger = None
+
+
+def activeThreshold():
+    threshold = getattr(profilingOverride, "threshold", None)
+    return threshold if threshold is not None else profileThreshold
+
+
+def isSingleSelect(text: str) -> bool:
+    text = text.strip().rstrip(";")
+    return ";" not in text and text.lstrip("( \n\t").upper().startswith("SELECT")
+
+
+class ProfilingConnection:
+    def __init__(self, conn, caller: str, params: dict, explain: bool):
+        self.conn = conn
+        self.caller = caller
+        self.params = params
+        self.explain = explain
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+    def renderQuery(self, query) -> str:
+        if isinstance(query, sql.Composable):
+            return query.as_string(self.conn.connection)
+        return str(query)
+
+    def explainQuery(self, text: str) -> tuple:
+        # returns (plan, error), the caller's transaction is left as it was
+        self.conn.execute(sql.SQL("SAVEPOINT profiling_explain"))
+        try:
+            _, plan = self.conn.execute(sql.SQL("EXPLAIN (ANALYZE, BUFFERS) ") + sql.SQL(text))
+        except Exception as e:
+            self.conn.execute(sql.SQL("ROLLBACK TO SAVEPOINT profiling_explain"))
+            return None, str(e)
+        self.conn.execute(sql.SQL("RELEASE SAVEPOINT profiling_explain"))
+        return "\n".join(next(iter(row)) for row in plan.rows), None
+
+    def execute(self, query, *args, **kwargs):
+        capture = getattr(profilingOverride, "capture", None)
+        start = time.perf_counter()
+        try:
+            res = self.conn.execute(query, *args, **kwargs)
+        except Exception as e:
+            if capture is not None:
+                capture[self.caller] = (None, "query failed: " + str(e))
+            raise
+        elapsed = time.perf_counter() - start
+        threshold = activeThreshold()
+        if threshold is None or elapsed < threshold:
+            return res
+        plan, error = None, None
+        try:
+            text = self.renderQuery(query)
+        except Exception as e:
+            text, error = repr(query), "could not render query: " + str(e)
+        if error is None:
+            if not self.explain:
+                error = "not explained, write connection"
+            elif not isSingleSelect(text):
+                error = "not explained, not a single SELECT statement"
+            else:
+                try:
+                    plan, error = self.explainQuery(text)
+                except Exception as e:
+                    error = "EXPLAIN failed: " + str(e)
+        if capture is not None and plan is not None:
+            capture[self.caller] = (plan, None)
+        elif capture is not None and self.caller not in capture:
+            capture[self.caller] = (None, error)
+        # capture-only runs of explainAnalyticQueries stay out of the slow-query log
+        if profileLogger is not None and capture is None:
+            profileLogger.info(json.dumps({
+                "function": self.caller,
+                "params": self.params,
+                "elapsed_ms": round(elapsed * 1000, 3),
+                "sql": text,
+                "plan": plan,
+                "explain_error": error,
+            }))
+        return res
+
+
+def profiled(conn, explain: bool):
+    if activeThreshold() is None:
+        return conn
+    stack = getattr(callContext, "stack", None)
+    if not stack:
+        return ProfilingConnection(conn, None, {}, explain)
+    # name and arguments come from the public function wrapper, see publicFunction
+    function, args, kwargs = stack[-1]
     try:
-        conn = Connector.DBConnector()
-        query = """
-                CREATE TABLE IF NOT EXISTS files(
-                    file_id INTEGER PRIMARY KEY CHECK (file_id > 0),
-                    type TEXT NOT NULL,
-                    size INTEGER NOT NULL CHECK (size >= 0)
-                 );
-                CREATE TABLE IF NOT EXISTS disks(
-                    disk_id INTEGER PRIMARY KEY CHECK (disk_id > 0),
-                    manufacturing_company TEXT NOT NULL,
-                    speed INTEGER NOT NULL CHECK (speed > 0),
-                    free_space INTEGER NOT NULL CHECK (free_space >= 0),
-                    cost_per_byte INTEGER NOT NULL CHECK (cost_per_byte > 0)
-                 );
-                CREATE TABLE IF NOT EXISTS rams(
-                    ram_id INTEGER PRIMARY KEY CHECK (ram_id > 0),
-                    company TEXT NOT NULL,
-                    size INTEGER NOT NULL CHECK (size > 0)
-                 );
-                CREATE TABLE IF NOT EXISTS saved_files(
+        arguments = inspect.signature(function).bind(*args, **kwargs).arguments
+    except TypeError:
+        arguments = {"args": args, "kwargs": kwargs}
+    params = {name: encodeValue(value) for name, value in arguments.items()}
+    return ProfilingConnection(conn, function.__name__, params, explain)
+
+
+# read/write routing: writers always use the primary (Connector.DBConnector),
+# read-only functions may be served by one of the configured replicas.
+# each replica is a DSN or a callable returning a connected DBConnector-like object.
+# read-your-writes is tracked per thread: after a successful commit the thread
+# remembers the primary's WAL position and only reads from replicas that have
+# replayed past it.
+readReplicas = []
+replicaMaxLag = None  # seconds, None means any lag is accepted
+lagCheckInterval = 1.0  # seconds a replica's checked position is reused
+replicaState = {}  # replica index -> (checkedAt, replayedLSN, lagAcceptable)
+replicaErrors = {}  # replica index -> last connection or configuration error
+nextReplica = 0
+routingLock = threading.Lock()
+session = threading.local()
+routingLogger = logging.getLogger("Solution.routing")
+
+
+def configureReadReplicas(replicas: List, maxLag: float = None, checkInterval: float = 1.0):
+    global readReplicas, replicaMaxLag, lagCheckInterval, nextReplica
+    # a replica is either a DSN string or a callable returning a connection
+    readReplicas = [replicaFactory(replica) if isinstance(replica, str) else replica
+                    for replica in replicas]
+    replicaMaxLag = maxLag
+    lagCheckInterval = checkInterval
+    nextReplica = 0
+    replicaState.clear()
+    replicaErrors.clear()
+
+
+def parseLSN(lsn: str) -> int:
+    high, low = lsn.split("/")
+    return (int(high, 16) << 32) + int(low, 16)
+
+
+class WriteConnection:
+    # primary connection that records the WAL position of each successful commit
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+    def commit(self):
+        self.conn.commit()
+        if not readReplicas:
+            return
+        try:
+            _, result = self.conn.execute(sql.SQL("SELECT pg_current_wal_lsn()::text AS lsn"))
+            self.conn.commit()
+            session.writeLSN = parseLSN(result[0]["lsn"])
+        except Exception as e:
+            # without a position no replica can be proven to have the write
+            routingLogger.warning("could not read primary WAL position: %s", e)
+            session.writeLSN = float("inf")
+
+
+def writeConnection():
+    return profiled(WriteConnection(Connector.DBConnector()), explain=False)
+
+
+def checkReplica(conn) -> tuple:
+    # returns (replayed LSN or None, whether the lag bound holds)
+    query = sql.SQL(
+        """
+        SELECT pg_is_in_recovery() AS in_recovery, 
+            (CASE WHEN pg_is_in_recovery() THEN pg_last_wal_replay_lsn() 
+                ELSE pg_current_wal_lsn() END)::text AS replayed, 
+            COALESCE(( 
+                SELECT status = 'streaming' 
+                AND last_msg_receipt_time >= now() - {fresh} * INTERVAL '1 second' 
+                FROM pg_stat_wal_receiver 
+            ), FALSE) AS streaming, 
+            pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() AS caught_up, 
+            EXTRACT(EPOCH FROM (now() - pg_last_xact_replay_timestamp())) AS lag 
+        """
+    ).format(
+        fresh=sql.Literal(replicaMaxLag if replicaMaxLag is not None else 0)
+    )
+    _, result = conn.execute(query)
+    conn.commit()
+    return replicaVerdict(result[0])
+
+
+def replicaVerdict(row) -> tuple:
+    replayed = parseLSN(row["replayed"]) if row["replayed"] is not None else None
+    if not row["in_recovery"]:
+        return replayed, True
+    if replayed is None:
+        # never replayed anything, its data is unknown
+        return None, False
+    if replicaMaxLag is None:
+        return replayed, True
+    # replayed everything received is only current while the receiver is
+    # streaming and heard from the primary within the lag bound; a stalled or
+    # disconnected receiver also has receive == replay
+    if row["streaming"] and row["caught_up"]:
+        return replayed, True
+    if row["lag"] is None:
+        return replayed, False
+    return replayed, float(row["lag"]) <= replicaMaxLag
+
+
+class ReplicaConnector(Connector.DBConnector):
+    # DBConnector on an explicit DSN instead of database.ini, so execute/commit
+    # and the DatabaseException mapping are the ones every function expects
+    def __init__(self, dsn: str):
+        self.connection = psycopg2.connect(dsn)
+        self.connection.autocommit = False
+        self.cursor = self.connection.cursor()
+
+
+def replicaFactory(dsn: str):
+    return functools.partial(ReplicaConnector, dsn)
+
+
+def cachedReplicaReady(index: int):
+    # True/False from a fresh check, None when the replica has to be asked again
+    writeLSN = getattr(session, "writeLSN", None)
+    if replicaMaxLag is None and writeLSN is None:
+        return True
+    state = replicaState.get(index)
+    if state is None or time.monotonic() - state[0] > lagCheckInterval:
+        return None
+    _, replayed, lagAcceptable = state
+    if not lagAcceptable:
+        return False
+    if writeLSN is None or (replayed is not None and replayed >= writeLSN):
+        return True
+    # the cached position may only be old, not behind
+    return None
+
+
+def routeReadConnection():
+    global nextReplica
+    for _ in range(len(readReplicas)):
+        with routingLock:
+            index = nextReplica % len(readReplicas)
+            nextReplica = (nextReplica + 1) % len(readReplicas)
+        ready = cachedReplicaReady(index)
+        if ready is False:
+            continue
+        conn = None
+        try:
+            conn = readReplicas[index]()
+            if ready is None:
+                replicaState[index] = (time.monotonic(),) + checkReplica(conn)
+                ready = cachedReplicaReady(index)
+            replicaErrors.pop(index, None)
+            if ready:
+                return conn
+        except Exception as e:
+            replicaErrors[index] = e
+            routingLogger.warning("read replica %d is unusable: %s", index, e)
+        if conn is not None:
+            conn.close()
+    # no usable replica, fall back to the primary
+    return Connector.DBConnector()
+
+
+def readConnection():
+    return profiled(routeReadConnection(), explain=True)
+
+
+# saved_files and disks_ram_enhanced may be hash-partitioned by disk_id so that
+# per-disk scans only touch one partition. 0 keeps the plain heap tables.
+partitionCount = 0
+schemaLogger = logging.getLogger("Solution.schema")
+
+
+def configurePartitioning(partitions: int):
+    # applies to the next createTables(), use migrateToPartitionedTables for existing data
+    global partitionCount
+    if partitions < 0:
+        raise ValueError("partition count must not be negative")
+    partitionCount = partitions
+
+
+def linkTablesQuery(partitions: int, ifNotExists: bool = True) -> str:
+    partitionBy = "PARTITION BY HASH (disk_id)" if partitions > 0 else ""
+    existence = "IF NOT EXISTS " if ifNotExists else ""
+    query = f"""
+                CREATE TABLE {existence}saved_files(
                     file_id INTEGER,
                     disk_id INTEGER,
                     FOREIGN KEY (file_id) 
@@ -52,8 +451,8 @@ def createTables():
                     REFERENCES disks(disk_id) 
                     ON DELETE CASCADE,
                     PRIMARY KEY(file_id, disk_id)
-                );
-                CREATE TABLE IF NOT EXISTS disks_ram_enhanced(
+                ) {partitionBy};
+                CREATE TABLE {existence}disks_ram_enhanced(
                     ram_id INTEGER,
                     disk_id INTEGER,
                     FOREIGN KEY (ram_id) 
@@ -63,8 +462,34 @@ def createTables():
                     REFERENCES disks(disk_id) 
                     ON DELETE CASCADE,
                     PRIMARY KEY(ram_id, disk_id)
-                );
-                
+                ) {partitionBy};
+    """
+    for table in ["saved_files", "disks_ram_enhanced"]:
+        for remainder in range(partitions):
+            query += f"""
+                CREATE TABLE {existence}{table}_p{remainder} 
+                PARTITION OF {table} 
+                FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder});
+            """
+    return query
+
+
+def linkTablesLayout(conn) -> dict:
+    # {table: partitioned} for the link tables that already exist
+    query = sql.SQL(
+        """
+        SELECT relname, relkind = 'p' AS partitioned 
+        FROM pg_class 
+        WHERE relname IN ('saved_files', 'disks_ram_enhanced') 
+        AND relkind IN ('r', 'p') 
+        AND pg_table_is_visible(oid) 
+        """
+    )
+    _, result = conn.execute(query)
+    return {row[0]: row[1] for row in result.rows}
+
+
+VIEWS_QUERY = """
                 CREATE VIEW saved_files_file_details AS 
                 SELECT saved_files.disk_id, files.* 
                 FROM saved_files 
@@ -95,24 +520,111 @@ def createTables():
                 JOIN disks_ram_enhanced_disk_details dDetails 
                 ON rDetails.ram_id = dDetails.ram_id 
                 AND rDetails.disk_id = dDetails.disk_id ;
-        """
+"""
+
+DROP_VIEWS_QUERY = """
+                    DROP VIEW IF EXISTS saved_files_file_details; 
+                    DROP VIEW IF EXISTS saved_files_disk_details; 
+                    DROP VIEW IF EXISTS rams_And_Disks_Details; 
+                    DROP VIEW IF EXISTS disks_ram_enhanced_ram_details; 
+                    DROP VIEW IF EXISTS disks_ram_enhanced_disk_details; 
+"""
+
+
+@publicFunction
+def createTables():
+    conn = None
+    try:
+        conn = writeConnection()
+        mismatched = [table for table, partitioned in linkTablesLayout(conn).items()
+                      if partitioned != (partitionCount > 0)]
+        if mismatched:
+            schemaLogger.error(
+                "createTables: %s already exist with a different layout than partitionCount=%d, "
+                "use migrateToPartitionedTables or dropTables first", ", ".join(mismatched), partitionCount)
+            conn.rollback()
+            return
+        query = """
+                CREATE TABLE IF NOT EXISTS files(
+                    file_id INTEGER PRIMARY KEY CHECK (file_id > 0),
+                    type TEXT NOT NULL,
+                    size INTEGER NOT NULL CHECK (size >= 0)
+                 );
+                CREATE TABLE IF NOT EXISTS disks(
+                    disk_id INTEGER PRIMARY KEY CHECK (disk_id > 0),
+                    manufacturing_company TEXT NOT NULL,
+                    speed INTEGER NOT NULL CHECK (speed > 0),
+                    free_space INTEGER NOT NULL CHECK (free_space >= 0),
+                    cost_per_byte INTEGER NOT NULL CHECK (cost_per_byte > 0)
+                 );
+                CREATE TABLE IF NOT EXISTS rams(
+                    ram_id INTEGER PRIMARY KEY CHECK (ram_id > 0),
+                    company TEXT NOT NULL,
+                    size INTEGER NOT NULL CHECK (size > 0)
+                 );
+        """ + linkTablesQuery(partitionCount) + VIEWS_QUERY
+        conn.execute(query)
+        conn.commit()
+    except Exception as e:
+        schemaLogger.error("createTables failed: %s", e)
+        conn.rollback()
+    finally:
+        # will happen any way after try termination or exception handling
+        conn.close()
+
+
+@publicFunction
+def migrateToPartitionedTables(partitions: int) -> Status:
+    # moves an existing plain layout to the hash-partitioned one in a single transaction
+    # and makes it the layout createTables() builds from then on
+    if partitions < 1:
+        return Status.BAD_PARAMS
+    conn = None
+    try:
+        conn = writeConnection()
+        # migrating an already partitioned layout would leave the old partitions
+        # attached to the renamed tables and drop them with those
+        partitioned = [table for table, isPartitioned in linkTablesLayout(conn).items() if isPartitioned]
+        if partitioned:
+            schemaLogger.error("migrateToPartitionedTables: %s already partitioned", ", ".join(partitioned))
+            conn.rollback()
+            return Status.ALREADY_EXISTS
+        query = DROP_VIEWS_QUERY + """
+            ALTER TABLE saved_files RENAME TO saved_files_unpartitioned; 
+            ALTER TABLE saved_files_unpartitioned 
+            RENAME CONSTRAINT saved_files_pkey TO saved_files_unpartitioned_pkey; 
+            ALTER TABLE disks_ram_enhanced RENAME TO disks_ram_enhanced_unpartitioned; 
+            ALTER TABLE disks_ram_enhanced_unpartitioned 
+            RENAME CONSTRAINT disks_ram_enhanced_pkey TO disks_ram_enhanced_unpartitioned_pkey; 
+        """ + linkTablesQuery(partitions, ifNotExists=False) + """
+            INSERT INTO saved_files(file_id,disk_id) 
+            SELECT file_id, disk_id FROM saved_files_unpartitioned; 
+            INSERT INTO disks_ram_enhanced(ram_id,disk_id) 
+            SELECT ram_id, disk_id FROM disks_ram_enhanced_unpartitioned; 
+            DROP TABLE saved_files_unpartitioned; 
+            DROP TABLE disks_ram_enhanced_unpartitioned; 
+        """ + VIEWS_QUERY
         conn.execute(query)
         conn.commit()
     except Exception as e:
         conn.rollback()
+        return Status.ERROR
     finally:
         # will happen any way after try termination or exception handling
         conn.close()
+    # keep later dropTables() + createTables() on the partitioned layout
+    configurePartitioning(partitions)
+    return Status.OK
 
 
+@publicFunction
 def clearTables():
     conn = None
     try:
-        conn = Connector.DBConnector()
+        conn = writeConnection()
+        # one TRUNCATE of all tables instead of row-by-row deletes and cascades
         query = """
-        DELETE FROM files; 
-        DELETE FROM disks; 
-        DELETE FROM rams; 
+        TRUNCATE TABLE saved_files, disks_ram_enhanced, files, disks, rams; 
         """
         conn.execute(query)
         conn.commit()
@@ -122,16 +634,12 @@ def clearTables():
         conn.close()
 
 
+@publicFunction
 def dropTables():
     conn = None
     try:
-        conn = Connector.DBConnector()
-        query = """
-                    DROP VIEW IF EXISTS saved_files_file_details; 
-                    DROP VIEW IF EXISTS saved_files_disk_details; 
-                    DROP VIEW IF EXISTS rams_And_Disks_Details; 
-                    DROP VIEW IF EXISTS disks_ram_enhanced_ram_details; 
-                    DROP VIEW IF EXISTS disks_ram_enhanced_disk_details; 
+        conn = writeConnection()
+        query = DROP_VIEWS_QUERY + """
                     DROP TABLE IF EXISTS disks_ram_enhanced; 
                     DROP TABLE IF EXISTS saved_files; 
                     DROP TABLE IF EXISTS files; 
@@ -147,10 +655,17 @@ def dropTables():
     pass
 
 
+def bulkStatuses(ids: List[int], result) -> List[Status]:
+    # maps the ids returned by a DELETE ... RETURNING back onto the requested ids
+    deleted = {next(iter(row)) for row in result.rows}
+    return [Status.OK if requested in deleted else Status.NOT_EXISTS for requested in ids]
+
+
+@publicFunction
 def addFile(file: File) -> Status:
     conn = None
     try:
-        conn = Connector.DBConnector()
+        conn = writeConnection()
         query = sql.SQL(
             """
                 INSERT INTO files(file_id,type,size)  
@@ -177,11 +692,12 @@ def addFile(file: File) -> Status:
     return Status.OK
 
 
+@publicFunction
 def getFileByID(fileID: int) -> File:
     conn = None
     result = 0
     try:
-        conn = Connector.DBConnector()
+        conn = readConnection()
         query = sql.SQL(
             "SELECT * FROM files where file_id={id} "
         ).format(id=sql.Literal(fileID))
@@ -201,10 +717,11 @@ def getFileByID(fileID: int) -> File:
     )
 
 
+@publicFunction
 def deleteFile(file: File) -> Status:
     conn = None
     try:
-        conn = Connector.DBConnector()
+        conn = writeConnection()
         query = sql.SQL(
             """
             UPDATE disks SET free_space = (free_space+{size})
@@ -228,10 +745,48 @@ def deleteFile(file: File) -> Status:
     return Status.OK
 
 
+@publicFunction
+def deleteFiles(fileIDs: List[int]) -> List[Status]:
+    if not fileIDs:
+        return []
+    conn = None
+    try:
+        conn = writeConnection()
+        query = sql.SQL(
+            """
+            WITH refunds AS (
+                UPDATE disks SET free_space = (disks.free_space+refund.total_size) 
+                FROM (
+                    SELECT saved_files.disk_id, SUM(files.size) AS total_size 
+                    FROM saved_files INNER JOIN files 
+                    ON saved_files.file_id = files.file_id 
+                    WHERE files.file_id = ANY({ids}::INTEGER[]) 
+                    GROUP BY saved_files.disk_id 
+                ) refund 
+                WHERE disks.disk_id = refund.disk_id 
+            ) 
+            DELETE FROM files WHERE file_id = ANY({ids}::INTEGER[]) 
+            RETURNING file_id 
+            """
+        ).format(
+            ids=sql.Literal(list(fileIDs))
+        )
+        _, result = conn.execute(query)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        return [Status.ERROR] * len(fileIDs)
+    finally:
+        # will happen any way after try termination or exception handling
+        conn.close()
+    return bulkStatuses(fileIDs, result)
+
+
+@publicFunction
 def addDisk(disk: Disk) -> Status:
     conn = None
     try:
-        conn = Connector.DBConnector()
+        conn = writeConnection()
         query = sql.SQL(
             """
             INSERT INTO disks(disk_id,manufacturing_company,speed,free_space,cost_per_byte)  
@@ -260,10 +815,11 @@ def addDisk(disk: Disk) -> Status:
     return Status.OK
 
 
+@publicFunction
 def getDiskByID(diskID: int) -> Disk:
     conn = None
     try:
-        conn = Connector.DBConnector()
+        conn = readConnection()
         query = sql.SQL(
             "SELECT * FROM disks where disk_id={id} ").format(id=sql.Literal(diskID))
         rows_effected, result = conn.execute(query)
@@ -284,10 +840,11 @@ def getDiskByID(diskID: int) -> Disk:
     )
 
 
+@publicFunction
 def deleteDisk(diskID: int) -> Status:
     conn = None
     try:
-        conn = Connector.DBConnector()
+        conn = writeConnection()
         query = sql.SQL(
             """
             SELECT * FROM disks WHERE disk_id={id}; 
@@ -308,10 +865,37 @@ def deleteDisk(diskID: int) -> Status:
     return Status.OK
 
 
+@publicFunction
+def deleteDisks(diskIDs: List[int]) -> List[Status]:
+    if not diskIDs:
+        return []
+    conn = None
+    try:
+        conn = writeConnection()
+        query = sql.SQL(
+            """
+            DELETE FROM disks WHERE disk_id = ANY({ids}::INTEGER[]) 
+            RETURNING disk_id 
+            """
+        ).format(
+            ids=sql.Literal(list(diskIDs))
+        )
+        _, result = conn.execute(query)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        return [Status.ERROR] * len(diskIDs)
+    finally:
+        # will happen any way after try termination or exception handling
+        conn.close()
+    return bulkStatuses(diskIDs, result)
+
+
+@publicFunction
 def addRAM(ram: RAM) -> Status:
     conn = None
     try:
-        conn = Connector.DBConnector()
+        conn = writeConnection()
         query = sql.SQL(
             "INSERT INTO rams(ram_id,company,size) VALUES({id},{company},{size}) "
         ).format(
@@ -335,11 +919,12 @@ def addRAM(ram: RAM) -> Status:
     return Status.OK
 
 
+@publicFunction
 def getRAMByID(ramID: int) -> RAM:
     conn = None
     result = 0
     try:
-        conn = Connector.DBConnector()
+        conn = readConnection()
         query = sql.SQL(
             "SELECT * FROM rams where ram_id={id} ").format(id=sql.Literal(ramID))
         rows_effected, result = conn.execute(query)
@@ -358,10 +943,11 @@ def getRAMByID(ramID: int) -> RAM:
     )
 
 
+@publicFunction
 def deleteRAM(ramID: int) -> Status:
     conn = None
     try:
-        conn = Connector.DBConnector()
+        conn = writeConnection()
         query = sql.SQL(
             """
             SELECT * FROM rams WHERE ram_id={id}; 
@@ -382,10 +968,37 @@ def deleteRAM(ramID: int) -> Status:
     return Status.OK
 
 
+@publicFunction
+def deleteRAMs(ramIDs: List[int]) -> List[Status]:
+    if not ramIDs:
+        return []
+    conn = None
+    try:
+        conn = writeConnection()
+        query = sql.SQL(
+            """
+            DELETE FROM rams WHERE ram_id = ANY({ids}::INTEGER[]) 
+            RETURNING ram_id 
+            """
+        ).format(
+            ids=sql.Literal(list(ramIDs))
+        )
+        _, result = conn.execute(query)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        return [Status.ERROR] * len(ramIDs)
+    finally:
+        # will happen any way after try termination or exception handling
+        conn.close()
+    return bulkStatuses(ramIDs, result)
+
+
+@publicFunction
 def addDiskAndFile(disk: Disk, file: File) -> Status:
     conn = None
     try:
-        conn = Connector.DBConnector()
+        conn = writeConnection()
         query = sql.SQL(
             """
             INSERT INTO disks(disk_id,manufacturing_company,speed,free_space,cost_per_byte) 
@@ -417,10 +1030,11 @@ def addDiskAndFile(disk: Disk, file: File) -> Status:
     return Status.OK
 
 
+@publicFunction
 def addFileToDisk(file: File, diskID: int) -> Status:
     conn = None
     try:
-        conn = Connector.DBConnector()
+        conn = writeConnection()
         query = sql.SQL(
             """
             INSERT INTO saved_files(file_id,disk_id) VALUES({fId},{dId}); 
@@ -451,10 +1065,11 @@ def addFileToDisk(file: File, diskID: int) -> Status:
     return Status.OK
 
 
+@publicFunction
 def removeFileFromDisk(file: File, diskID: int) -> Status:
     conn = None
     try:
-        conn = Connector.DBConnector()
+        conn = writeConnection()
         query = sql.SQL(
             """
             SELECT * FROM saved_files where file_id={fID} AND disk_id={dID}; 
@@ -479,10 +1094,49 @@ def removeFileFromDisk(file: File, diskID: int) -> Status:
     return Status.OK
 
 
+@publicFunction
+def removeFilesFromDisk(fileIDs: List[int], diskID: int) -> List[Status]:
+    if not fileIDs:
+        return []
+    conn = None
+    try:
+        conn = writeConnection()
+        query = sql.SQL(
+            """
+            WITH removed AS (
+                DELETE FROM saved_files 
+                WHERE disk_id={dID} AND file_id = ANY({ids}::INTEGER[]) 
+                RETURNING file_id 
+            ), refund AS (
+                UPDATE disks SET free_space = (free_space+(
+                    SELECT COALESCE(SUM(files.size),0) 
+                    FROM removed INNER JOIN files 
+                    ON removed.file_id = files.file_id 
+                )) 
+                WHERE disk_id={dID} AND EXISTS (SELECT 1 FROM removed) 
+            ) 
+            SELECT file_id FROM removed 
+            """
+        ).format(
+            ids=sql.Literal(list(fileIDs)),
+            dID=sql.Literal(diskID)
+        )
+        _, result = conn.execute(query)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        return [Status.ERROR] * len(fileIDs)
+    finally:
+        # will happen any way after try termination or exception handling
+        conn.close()
+    return bulkStatuses(fileIDs, result)
+
+
+@publicFunction
 def addRAMToDisk(ramID: int, diskID: int) -> Status:
     conn = None
     try:
-        conn = Connector.DBConnector()
+        conn = writeConnection()
         query = sql.SQL(
             """
             INSERT INTO disks_ram_enhanced(ram_id,disk_id)  
@@ -505,10 +1159,11 @@ def addRAMToDisk(ramID: int, diskID: int) -> Status:
     return Status.OK
 
 
+@publicFunction
 def removeRAMFromDisk(ramID: int, diskID: int) -> Status:
     conn = None
     try:
-        conn = Connector.DBConnector()
+        conn = writeConnection()
         query = sql.SQL(
             "DELETE FROM disks_ram_enhanced WHERE ram_id={rID} AND disk_id={dID} "
         ).format(
@@ -527,10 +1182,11 @@ def removeRAMFromDisk(ramID: int, diskID: int) -> Status:
     return Status.OK
 
 
+@publicFunction
 def averageFileSizeOnDisk(diskID: int) -> float:
     conn = None
     try:
-        conn = Connector.DBConnector()
+        conn = readConnection()
         query = sql.SQL(
             """
             SELECT COALESCE(AVG(size),0) as size_avg 
@@ -550,10 +1206,11 @@ def averageFileSizeOnDisk(diskID: int) -> float:
     return result[0]["size_avg"]
 
 
+@publicFunction
 def diskTotalRAM(diskID: int) -> int:
     conn = None
     try:
-        conn = Connector.DBConnector()
+        conn = readConnection()
         query = sql.SQL(
             """
             SELECT COALESCE(SUM(size),0) AS size_sum 
@@ -573,10 +1230,11 @@ def diskTotalRAM(diskID: int) -> int:
     return result[0]["size_sum"]
 
 
+@publicFunction
 def getCostForType(type: str) -> int:
     conn = None
     try:
-        conn = Connector.DBConnector()
+        conn = readConnection()
         query = sql.SQL(
             """
             SELECT COALESCE(SUM(fDetails.size * dDetails.cost_per_byte),0) as total_cost 
@@ -600,10 +1258,11 @@ def getCostForType(type: str) -> int:
     return result[0]["total_cost"]
 
 
+@publicFunction
 def getFilesCanBeAddedToDisk(diskID: int) -> List[int]:
     conn = None
     try:
-        conn = Connector.DBConnector()
+        conn = readConnection()
         query = sql.SQL(
             """
             SELECT file_id 
@@ -625,10 +1284,11 @@ def getFilesCanBeAddedToDisk(diskID: int) -> List[int]:
     return [next(iter(row)) for row in result.rows]
 
 
+@publicFunction
 def getFilesCanBeAddedToDiskAndRAM(diskID: int) -> List[int]:
     conn = None
     try:
-        conn = Connector.DBConnector()
+        conn = readConnection()
         query = sql.SQL(
             """
             SELECT file_id 
@@ -655,10 +1315,11 @@ def getFilesCanBeAddedToDiskAndRAM(diskID: int) -> List[int]:
     return [next(iter(row)) for row in result.rows]
 
 
+@publicFunction
 def isCompanyExclusive(diskID: int) -> bool:
     conn = None
     try:
-        conn = Connector.DBConnector()
+        conn = readConnection()
         query = sql.SQL(
             """
             ( 
@@ -688,10 +1349,11 @@ def isCompanyExclusive(diskID: int) -> bool:
     return result.isEmpty()
 
 
+@publicFunction
 def getConflictingDisks() -> List[int]:
     conn = None
     try:
-        conn = Connector.DBConnector()
+        conn = readConnection()
         query = sql.SQL(
             """
             SELECT DISTINCT leftCopy.disk_id 
@@ -712,10 +1374,11 @@ def getConflictingDisks() -> List[int]:
     return [next(iter(row)) for row in result.rows]
 
 
+@publicFunction
 def mostAvailableDisks() -> List[int]:
     conn = None
     try:
-        conn = Connector.DBConnector()
+        conn = readConnection()
         query = sql.SQL(
             """
             SELECT disks.disk_id,disks.speed,file_counts.files_count 
@@ -743,10 +1406,11 @@ def mostAvailableDisks() -> List[int]:
     return [next(iter(row)) for row in result.rows]
 
 
+@publicFunction
 def getCloseFiles(fileID: int) -> List[int]:
     conn = None
     try:
-        conn = Connector.DBConnector()
+        conn = readConnection()
         query = sql.SQL(
             """
             SELECT file_id FROM (
@@ -785,3 +1449,229 @@ def getCloseFiles(fileID: int) -> List[int]:
         # will happen any way after try termination or exception handling
         conn.close()
     return [next(iter(row)) for row in result.rows]
+
+
+def explainAnalyticQueries(fileID: int, diskID: int, fileType: str) -> dict:
+    # runs every analytic function once on this thread with a zero threshold and
+    # returns {"plans": {function: plan}, "failed": {function: reason}}
+    calls = [
+        (averageFileSizeOnDisk, (diskID,)),
+        (diskTotalRAM, (diskID,)),
+        (getCostForType, (fileType,)),
+        (getFilesCanBeAddedToDisk, (diskID,)),
+        (getFilesCanBeAddedToDiskAndRAM, (diskID,)),
+        (isCompanyExclusive, (diskID,)),
+        (getConflictingDisks, ()),
+        (mostAvailableDisks, ()),
+        (getCloseFiles, (fileID,)),
+    ]
+    profilingOverride.threshold = 0
+    profilingOverride.capture = {}
+    # synthetic calls, not part of the recorded workload
+    recordingSuppressed.active = True
+    try:
+        for function, args in calls:
+            function(*args)
+        capture = profilingOverride.capture
+    finally:
+        profilingOverride.threshold = None
+        profilingOverride.capture = None
+        recordingSuppressed.active = False
+    report = {"plans": {}, "failed": {}}
+    for function, _ in calls:
+        name = function.__name__
+        plan, error = capture.get(name, (None, "no query was executed"))
+        if plan is not None:
+            report["plans"][name] = plan
+        else:
+            report["failed"][name] = error
+    return report
+
+
+# columnar snapshots: every column is stored as a little-endian int32 file
+# (<table>.<column>.i4), text columns are dictionary encoded into int32 codes
+# with the dictionary kept next to them (<table>.<column>.dict.json).
+SNAPSHOT_TABLES = {
+    "files": [("file_id", "int"), ("type", "text"), ("size", "int")],
+    "disks": [("disk_id", "int"), ("manufacturing_company", "text"), ("speed", "int"),
+              ("free_space", "int"), ("cost_per_byte", "int")],
+    "rams": [("ram_id", "int"), ("company", "text"), ("size", "int")],
+    "saved_files": [("file_id", "int"), ("disk_id", "int")],
+    "disks_ram_enhanced": [("ram_id", "int"), ("disk_id", "int")],
+}
+COPY_SIGNATURE = b"PGCOPY\n\xff\r\n\x00"
+
+
+def readCopyRows(stream):
+    # parser for the COPY ... (FORMAT binary) stream, yields the raw fields of each row
+    header = stream.read(19)
+    if header[:11] != COPY_SIGNATURE:
+        raise ValueError("not a binary COPY stream")
+    stream.read(struct.unpack("!i", header[15:19])[0])
+    while True:
+        fieldCount = struct.unpack("!h", stream.read(2))[0]
+        if fieldCount == -1:
+            return
+        fields = []
+        for _ in range(fieldCount):
+            length = struct.unpack("!i", stream.read(4))[0]
+            if length < 0:
+                raise ValueError("unexpected NULL in snapshot column")
+            fields.append(stream.read(length))
+        yield fields
+
+
+def writeColumns(stream, directory: str, table: str, columns: List) -> int:
+    outputs = [open(os.path.join(directory, f"{table}.{name}.i4"), "wb") for name, _ in columns]
+    dictionaries = [{} if kind == "text" else None for _, kind in columns]
+    rows = 0
+    try:
+        for fields in readCopyRows(stream):
+            for field, output, dictionary in zip(fields, outputs, dictionaries):
+                if dictionary is None:
+                    # int4 arrives big-endian
+                    output.write(field[::-1])
+                else:
+                    output.write(struct.pack("<i", dictionary.setdefault(field, len(dictionary))))
+            rows += 1
+    finally:
+        for output in outputs:
+            output.close()
+    for (name, _), dictionary in zip(columns, dictionaries):
+        if dictionary is not None:
+            with open(os.path.join(directory, f"{table}.{name}.dict.json"), "w") as f:
+                json.dump([value.decode("utf-8") for value in dictionary], f)
+    with open(os.path.join(directory, f"{table}.json"), "w") as f:
+        json.dump({"rows": rows, "columns": columns}, f)
+    return rows
+
+
+def streamColumns(conn, copyQuery: str, directory: str, table: str, columns: List) -> int:
+    # COPY writes into a pipe that a reader thread parses straight into the
+    # column files, so the table is never staged on disk or in memory
+    readFd, writeFd = os.pipe()
+    outcome = {}
+
+    def consume():
+        with os.fdopen(readFd, "rb") as reader:
+            try:
+                outcome["rows"] = writeColumns(reader, directory, table, columns)
+            except Exception as e:
+                outcome["error"] = e
+            # keep draining so COPY never blocks on a full pipe
+            while reader.read(1 << 16):
+                pass
+
+    consumer = threading.Thread(target=consume, daemon=True)
+    consumer.start()
+    try:
+        with os.fdopen(writeFd, "wb") as writer:
+            conn.cursor.copy_expert(copyQuery, writer)
+    finally:
+        consumer.join()
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["rows"]
+
+
+# profiled but not recorded, replaying it would only rewrite snapshot files
+@publicFunction(record=False)
+def exportSnapshot(directory: str) -> Status:
+    conn = None
+    try:
+        os.makedirs(directory, exist_ok=True)
+        conn = readConnection()
+        # all tables are copied from the same snapshot
+        conn.execute(sql.SQL("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY"))
+        for table, columns in SNAPSHOT_TABLES.items():
+            # COPY (SELECT ...) also works for partitioned tables, which plain COPY rejects
+            query = sql.SQL("COPY (SELECT {columns} FROM {table}) TO STDOUT (FORMAT binary)").format(
+                table=sql.Identifier(table),
+                columns=sql.SQL(",").join(sql.Identifier(name) for name, _ in columns)
+            )
+            streamColumns(conn, query.as_string(conn.connection), directory, table, columns)
+        conn.commit()
+    except Exception as e:
+        if conn is not None:
+            conn.rollback()
+        return Status.ERROR
+    finally:
+        # will happen any way after try termination or exception handling
+        if conn is not None:
+            conn.close()
+    return Status.OK
+
+
+def loadSnapshot(directory: str) -> dict:
+    # {table: {"rows": n, "columns": {name: int32 memoryview}, "dictionaries": {name: [str]}}}
+    # the column views are backed directly by read-only memory maps of the files
+    if sys.byteorder != "little":
+        raise ValueError("snapshots are stored little-endian")
+    snapshot = {}
+    for table in SNAPSHOT_TABLES:
+        with open(os.path.join(directory, f"{table}.json")) as f:
+            manifest = json.load(f)
+        tableData = {"rows": manifest["rows"], "columns": {}, "dictionaries": {}}
+        for name, kind in manifest["columns"]:
+            path = os.path.join(directory, f"{table}.{name}.i4")
+            if manifest["rows"] == 0:
+                tableData["columns"][name] = memoryview(b"").cast("i")
+            else:
+                with open(path, "rb") as f:
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                tableData["columns"][name] = memoryview(mapped).cast("i")
+            if kind == "text":
+                with open(os.path.join(directory, f"{table}.{name}.dict.json")) as f:
+                    tableData["dictionaries"][name] = json.load(f)
+        snapshot[table] = tableData
+    return snapshot
+
+
+def percentile(sortedValues: List[float], p: float) -> float:
+    if not sortedValues:
+        return 0.0
+    return sortedValues[min(len(sortedValues) - 1, int(round(p / 100 * (len(sortedValues) - 1))))]
+
+
+def replayWorkload(path: str, speed: float = 1.0, concurrency: int = 1) -> dict:
+    # speed is the time scale (2.0 replays twice as fast), None replays unthrottled
+    with open(path) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    # only replay the public functions the recorder can produce
+    unknown = sorted({record["f"] for record in records} - set(RECORDED_FUNCTIONS))
+    if unknown:
+        raise ValueError("workload calls functions that are not recorded: " + ", ".join(unknown))
+    # lines are written when calls finish, replay them in start order
+    records.sort(key=lambda record: record["t"])
+    firstTimestamp = records[0]["t"] if records else 0
+    begin = time.monotonic()
+
+    def run(record):
+        if speed:
+            delay = begin + (record["t"] - firstTimestamp) / speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        function = RECORDED_FUNCTIONS[record["f"]]
+        start = time.perf_counter()
+        kwargs = {key: decodeValue(value) for key, value in record.get("k", {}).items()}
+        result = function(*decodeValue(record["a"]), **kwargs)
+        return time.perf_counter() - start, encodeValue(result)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(run, records))
+    elapsed = time.monotonic() - begin
+    latencies = sorted(latency * 1000 for latency, _ in outcomes)
+    divergences = [
+        {"index": index, "function": record["f"], "expected": record["r"], "actual": actual}
+        for index, (record, (_, actual)) in enumerate(zip(records, outcomes))
+        if actual != record["r"]
+    ]
+    return {
+        "calls": len(records),
+        "elapsed_s": elapsed,
+        "throughput": len(records) / elapsed if elapsed > 0 else 0.0,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "divergences": divergences,
+    }
@@ -0,0 +1,110 @@
+"""Per-disk query latency on the plain vs. the hash-partitioned link tables.
+
+Needs the same database.ini as Solution.py. The tables are DROPPED and
+refilled, so run it against a scratch database only:
+
+    python benchmark_partitioning.py --disks 1000 --files 1000000 --copies 3 --partitions 16
+"""
+import argparse
+import random
+import statistics
+import time
+
+import Utility.DBConnector as Connector
+from psycopg2 import sql
+
+import Solution
+
+
+def populate(disks: int, files: int, copies: int, rams: int):
+    conn = Connector.DBConnector()
+    try:
+        query = sql.SQL(
+            """
+            INSERT INTO disks(disk_id,manufacturing_company,speed,free_space,cost_per_byte)
+            SELECT g, 'company' || (g % 7), 1 + g % 100, 2000000000, 1 + g % 5
+            FROM generate_series(1,{disks}) g;
+            INSERT INTO files(file_id,type,size)
+            SELECT g, 'type' || (g % 11), g % 1000
+            FROM generate_series(1,{files}) g;
+            INSERT INTO saved_files(file_id,disk_id)
+            SELECT f, 1 + (f + c * 7919) % {disks}
+            FROM generate_series(1,{files}) f, generate_series(0,{copies}-1) c
+            ON CONFLICT DO NOTHING;
+            INSERT INTO rams(ram_id,company,size)
+            SELECT g, 'company' || (g % 7), 1 + g % 64
+            FROM generate_series(1,{rams}) g;
+            INSERT INTO disks_ram_enhanced(ram_id,disk_id)
+            SELECT g, 1 + g % {disks}
+            FROM generate_series(1,{rams}) g;
+            """
+        ).format(
+            disks=sql.Literal(disks),
+            files=sql.Literal(files),
+            copies=sql.Literal(copies),
+            rams=sql.Literal(rams)
+        )
+        conn.execute(query)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def analyze():
+    conn = Connector.DBConnector()
+    try:
+        conn.execute(sql.SQL("ANALYZE"))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def measure(function, diskIDs) -> dict:
+    latencies = []
+    for diskID in diskIDs:
+        start = time.perf_counter()
+        function(diskID)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return {
+        "median_ms": statistics.median(latencies),
+        "p95_ms": latencies[min(len(latencies) - 1, int(round(0.95 * (len(latencies) - 1))))],
+    }
+
+
+def report(layout: str, diskIDs):
+    for function in [Solution.averageFileSizeOnDisk, Solution.diskTotalRAM]:
+        result = measure(function, diskIDs)
+        print(f"{layout:<14} {function.__name__:<24} "
+              f"median {result['median_ms']:9.3f} ms   p95 {result['p95_ms']:9.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--disks", type=int, default=1000)
+    parser.add_argument("--files", type=int, default=1000000)
+    parser.add_argument("--copies", type=int, default=3)
+    parser.add_argument("--rams", type=int, default=100000)
+    parser.add_argument("--partitions", type=int, default=16)
+    parser.add_argument("--samples", type=int, default=200)
+    args = parser.parse_args()
+
+    Solution.dropTables()
+    Solution.configurePartitioning(0)
+    Solution.createTables()
+    populate(args.disks, args.files, args.copies, args.rams)
+    analyze()
+    diskIDs = [random.randint(1, args.disks) for _ in range(args.samples)]
+
+    report("plain", diskIDs)
+    if Solution.migrateToPartitionedTables(args.partitions) != Solution.Status.OK:
+        raise SystemExit("migration to the partitioned layout failed")
+    analyze()
+    report(f"hash/{args.partitions}", diskIDs)
+
+    Solution.dropTables()
+    Solution.configurePartitioning(0)
+
+
+if __name__ == "__main__":
+    main()
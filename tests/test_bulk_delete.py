@@ -0,0 +1,30 @@
+import unittest
+
+import Solution
+from Utility.Status import Status
+
+
+class Result:
+    def __init__(self, ids):
+        self.rows = [(id,) for id in ids]
+
+
+class TestBulkStatuses(unittest.TestCase):
+    def test_mixed(self):
+        self.assertEqual(Solution.bulkStatuses([1, 2, 3], Result([3, 1])),
+                         [Status.OK, Status.NOT_EXISTS, Status.OK])
+
+    def test_none_deleted(self):
+        self.assertEqual(Solution.bulkStatuses([4, 5], Result([])),
+                         [Status.NOT_EXISTS, Status.NOT_EXISTS])
+
+    def test_keeps_order_and_duplicates(self):
+        self.assertEqual(Solution.bulkStatuses([2, 2, 1], Result([2])),
+                         [Status.OK, Status.OK, Status.NOT_EXISTS])
+
+    def test_empty(self):
+        self.assertEqual(Solution.bulkStatuses([], Result([])), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
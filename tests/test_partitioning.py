@@ -0,0 +1,76 @@
+import unittest
+from unittest import mock
+
+import Solution
+from Utility.Status import Status
+
+
+class Result:
+    def __init__(self, rows):
+        self.rows = rows
+
+
+class FakeConnection:
+    def __init__(self, layout):
+        self.layout = layout
+        self.queries = []
+
+    def execute(self, query, printSchema=False):
+        self.queries.append(query)
+        return len(self.layout), Result(self.layout)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class TestPartitioning(unittest.TestCase):
+    def setUp(self):
+        self.partitions = Solution.partitionCount
+
+    def tearDown(self):
+        Solution.configurePartitioning(self.partitions)
+
+    def connect(self, layout):
+        conn = FakeConnection(layout)
+        return conn, mock.patch.object(Solution.Connector, "DBConnector", lambda: conn)
+
+    def test_link_tables_query(self):
+        self.assertNotIn("PARTITION", Solution.linkTablesQuery(0))
+        query = Solution.linkTablesQuery(4, ifNotExists=False)
+        self.assertNotIn("IF NOT EXISTS", query)
+        self.assertIn("saved_files_p3", query)
+        self.assertIn("disks_ram_enhanced_p3", query)
+        self.assertIn("MODULUS 4, REMAINDER 0", query)
+
+    def test_configure(self):
+        Solution.configurePartitioning(8)
+        self.assertEqual(Solution.partitionCount, 8)
+        with self.assertRaises(ValueError):
+            Solution.configurePartitioning(-1)
+
+    def test_migrate_rejects_partitioned_layout(self):
+        conn, patch = self.connect([("saved_files", True), ("disks_ram_enhanced", True)])
+        with patch:
+            self.assertEqual(Solution.migrateToPartitionedTables(4), Status.ALREADY_EXISTS)
+        # only the layout query ran
+        self.assertEqual(len(conn.queries), 1)
+
+    def test_migrate_bad_partition_count(self):
+        self.assertEqual(Solution.migrateToPartitionedTables(0), Status.BAD_PARAMS)
+
+    def test_create_tables_rejects_layout_mismatch(self):
+        Solution.configurePartitioning(4)
+        conn, patch = self.connect([("saved_files", False), ("disks_ram_enhanced", False)])
+        with patch, self.assertLogs("Solution.schema", level="ERROR"):
+            Solution.createTables()
+        self.assertEqual(len(conn.queries), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+import collections
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from psycopg2 import sql
+
+import Solution
+from Business.File import File
+
+
+def queryText(query) -> str:
+    if isinstance(query, sql.Composed):
+        return "".join(queryText(part) for part in query.seq)
+    if isinstance(query, sql.SQL):
+        return query.string
+    return str(query)
+
+
+class Result:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __getitem__(self, index):
+        return collections.defaultdict(int)
+
+    def isEmpty(self):
+        return not self.rows
+
+
+class FakeConnection:
+    def __init__(self, explainFails=False):
+        self.explainFails = explainFails
+        self.queries = []
+        self.rolledBack = False
+
+    def execute(self, query, printSchema=False):
+        text = queryText(query)
+        self.queries.append(text)
+        if text.startswith("EXPLAIN"):
+            if self.explainFails:
+                raise RuntimeError("cannot EXPLAIN this")
+            return 2, Result([("Seq Scan on files",), ("Planning Time: 0.1 ms",)])
+        return 1, Result([(1,)])
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        self.rolledBack = True
+
+    def close(self):
+        pass
+
+
+@Solution.publicFunction(record=False)
+def probe(file, diskID=3):
+    return Solution.profiled(FakeConnection(), explain=True)
+
+
+class TestIsSingleSelect(unittest.TestCase):
+    def test_select(self):
+        self.assertTrue(Solution.isSingleSelect("SELECT * FROM files"))
+        self.assertTrue(Solution.isSingleSelect("\n  select 1;  "))
+        self.assertTrue(Solution.isSingleSelect("( SELECT 1 ) UNION ( SELECT 2 )"))
+
+    def test_not_single_select(self):
+        self.assertFalse(Solution.isSingleSelect("SELECT 1; DELETE FROM files"))
+        self.assertFalse(Solution.isSingleSelect("DELETE FROM files WHERE file_id=1"))
+        self.assertFalse(Solution.isSingleSelect("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ"))
+        self.assertFalse(Solution.isSingleSelect("WITH x AS (DELETE FROM files RETURNING 1) SELECT * FROM x"))
+
+
+class TestProfilingConnection(unittest.TestCase):
+    def setUp(self):
+        Solution.profilingOverride.threshold = 0
+        Solution.profilingOverride.capture = {}
+
+    def tearDown(self):
+        Solution.profilingOverride.threshold = None
+        Solution.profilingOverride.capture = None
+
+    def test_explain_uses_savepoint(self):
+        conn = FakeConnection()
+        Solution.ProfilingConnection(conn, "probe", {}, explain=True).execute("SELECT * FROM files")
+        self.assertEqual(conn.queries, [
+            "SELECT * FROM files",
+            "SAVEPOINT profiling_explain",
+            "EXPLAIN (ANALYZE, BUFFERS) SELECT * FROM files",
+            "RELEASE SAVEPOINT profiling_explain",
+        ])
+        self.assertEqual(Solution.profilingOverride.capture["probe"],
+                         ("Seq Scan on files\nPlanning Time: 0.1 ms", None))
+
+    def test_failed_explain_rolls_back_to_savepoint_only(self):
+        conn = FakeConnection(explainFails=True)
+        Solution.ProfilingConnection(conn, "probe", {}, explain=True).execute("SELECT 1")
+        self.assertEqual(conn.queries[-1], "ROLLBACK TO SAVEPOINT profiling_explain")
+        self.assertFalse(conn.rolledBack)
+        plan, error = Solution.profilingOverride.capture["probe"]
+        self.assertIsNone(plan)
+        self.assertIn("cannot EXPLAIN this", error)
+
+    def test_only_single_selects_on_read_connections_are_explained(self):
+        for query, explain in [("SET TRANSACTION READ ONLY", True),
+                               ("SELECT 1; DELETE FROM files", True),
+                               ("SELECT 1", False)]:
+            conn = FakeConnection()
+            Solution.ProfilingConnection(conn, "probe", {}, explain=explain).execute(query)
+            self.assertEqual(conn.queries, [query])
+
+    def test_profiled_binds_call_arguments(self):
+        conn = probe(File(1, "pdf", 10))
+        self.assertEqual(conn.caller, "probe")
+        self.assertEqual(conn.params, {"file": {"File": [1, "pdf", 10]}})
+        conn = probe(File(2, "txt", 0), diskID=4)
+        self.assertEqual(conn.params, {"file": {"File": [2, "txt", 0]}, "diskID": 4})
+
+    def test_profiling_off_returns_plain_connection(self):
+        Solution.profilingOverride.threshold = None
+        self.assertIsInstance(probe(File(1, "pdf", 10)), FakeConnection)
+
+
+class TestExplainAnalyticQueries(unittest.TestCase):
+    def test_not_recorded_or_logged(self):
+        directory = tempfile.mkdtemp()
+        workload = os.path.join(directory, "workload.log")
+        slowLog = os.path.join(directory, "slow.log")
+        with mock.patch.object(Solution.Connector, "DBConnector", FakeConnection):
+            Solution.startRecording(workload)
+            Solution.enableProfiling(60, slowLog)
+            try:
+                report = Solution.explainAnalyticQueries(1, 2, "pdf")
+            finally:
+                Solution.stopRecording()
+                Solution.disableProfiling()
+        self.assertEqual(len(report["plans"]) + len(report["failed"]), 9)
+        self.assertEqual(os.path.getsize(workload), 0)
+        self.assertEqual(os.path.getsize(slowLog), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
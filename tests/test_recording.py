@@ -0,0 +1,99 @@
+import decimal
+import json
+import os
+import tempfile
+import unittest
+
+import Solution
+from Business.Disk import Disk
+from Business.File import File
+from Business.RAM import RAM
+from Utility.Status import Status
+
+
+class TestRecording(unittest.TestCase):
+    def test_round_trip(self):
+        values = [
+            Status.OK,
+            File(1, "pdf", 10),
+            Disk(2, "DELL", 10, 100, 3),
+            RAM(3, "wolf", 5),
+            [Status.OK, Status.NOT_EXISTS],
+            (File(4, "txt", 0), 2),
+            [1, 2, 3],
+            "pdf",
+            1.5,
+            True,
+            None,
+        ]
+        for value in values:
+            encoded = Solution.encodeValue(value)
+            self.assertEqual(Solution.encodeValue(Solution.decodeValue(encoded)), encoded)
+
+    def test_decode_types(self):
+        self.assertIs(Solution.decodeValue({"Status": "ALREADY_EXISTS"}), Status.ALREADY_EXISTS)
+        file = Solution.decodeValue({"File": [1, "pdf", 10]})
+        self.assertEqual((file.getFileID(), file.getType(), file.getSize()), (1, "pdf", 10))
+
+    def test_decimal_becomes_float(self):
+        self.assertEqual(Solution.encodeValue(decimal.Decimal("2.5")), 2.5)
+
+    def test_percentile(self):
+        self.assertEqual(Solution.percentile([], 50), 0.0)
+        self.assertEqual(Solution.percentile([7.0], 99), 7.0)
+        values = [float(i) for i in range(1, 101)]
+        self.assertEqual(Solution.percentile(values, 0), 1.0)
+        self.assertEqual(Solution.percentile(values, 50), 51.0)
+        self.assertEqual(Solution.percentile(values, 100), 100.0)
+
+
+
+calls = []
+
+
+@Solution.publicFunction
+def probe(fileID, file=None):
+    calls.append(fileID)
+    return Status.OK
+
+
+class TestRecordAndReplay(unittest.TestCase):
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), "workload.log")
+        calls.clear()
+
+    def tearDown(self):
+        Solution.stopRecording()
+
+    def test_keyword_arguments(self):
+        Solution.startRecording(self.path)
+        self.assertEqual(probe(fileID=1, file=File(1, "pdf", 10)), Status.OK)
+        probe(2)
+        Solution.stopRecording()
+        with open(self.path) as f:
+            entries = [json.loads(line) for line in f]
+        self.assertEqual(entries[0]["k"], {"fileID": 1, "file": {"File": [1, "pdf", 10]}})
+        self.assertNotIn("k", entries[1])
+        calls.clear()
+        report = Solution.replayWorkload(self.path, speed=None)
+        self.assertEqual(calls, [1, 2])
+        self.assertEqual(report["divergences"], [])
+
+    def test_replays_in_start_order(self):
+        with open(self.path, "w") as f:
+            for timestamp, fileID in [(10.2, 3), (10.0, 1), (10.1, 2)]:
+                f.write(json.dumps({"t": timestamp, "f": "probe", "a": [fileID], "r": {"Status": "OK"}}) + "\n")
+        report = Solution.replayWorkload(self.path, speed=None)
+        self.assertEqual(calls, [1, 2, 3])
+        self.assertEqual(report["calls"], 3)
+
+    def test_rejects_unrecorded_functions(self):
+        with open(self.path, "w") as f:
+            f.write(json.dumps({"t": 0, "f": "exportSnapshot", "a": ["/tmp"], "r": None}) + "\n")
+        with self.assertRaises(ValueError):
+            Solution.replayWorkload(self.path)
+        self.assertNotIn("exportSnapshot", Solution.RECORDED_FUNCTIONS)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+import unittest
+from unittest import mock
+
+import Solution
+
+
+class Result:
+    def __init__(self, row):
+        self.rows = [tuple(row.values())]
+        self.row = row
+
+    def __getitem__(self, index):
+        return self.row
+
+
+class FakeConnection:
+    def __init__(self, name, row=None):
+        self.name = name
+        self.row = row
+        self.checks = 0
+        self.closed = False
+
+    def execute(self, query, printSchema=False):
+        self.checks += 1
+        return 1, Result(self.row)
+
+    def commit(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def replicaRow(replayed="0/100", inRecovery=True, streaming=True, caughtUp=True, lag=0.0):
+    return {"in_recovery": inRecovery, "replayed": replayed, "streaming": streaming,
+            "caught_up": caughtUp, "lag": lag}
+
+
+class TestRouting(unittest.TestCase):
+    def setUp(self):
+        self.primary = mock.patch.object(Solution.Connector, "DBConnector",
+                                         lambda: FakeConnection("primary"))
+        self.primary.start()
+        Solution.session.writeLSN = None
+
+    def tearDown(self):
+        self.primary.stop()
+        Solution.session.writeLSN = None
+        Solution.configureReadReplicas([])
+
+    def replica(self, name, row):
+        connections = []
+
+        def factory():
+            connections.append(FakeConnection(name, row))
+            return connections[-1]
+        return factory, connections
+
+    def test_parse_lsn(self):
+        self.assertEqual(Solution.parseLSN("0/0"), 0)
+        self.assertEqual(Solution.parseLSN("0/1A"), 26)
+        self.assertEqual(Solution.parseLSN("2/10"), (2 << 32) + 16)
+        self.assertLess(Solution.parseLSN("0/FFFFFFFF"), Solution.parseLSN("1/0"))
+
+    def test_verdict_without_lag_bound(self):
+        Solution.configureReadReplicas([], maxLag=None)
+        self.assertEqual(Solution.replicaVerdict(replicaRow(streaming=False, lag=None)), (256, True))
+        self.assertEqual(Solution.replicaVerdict(replicaRow(replayed=None)), (None, False))
+
+    def test_verdict_with_lag_bound(self):
+        Solution.configureReadReplicas([], maxLag=5)
+        self.assertEqual(Solution.replicaVerdict(replicaRow(lag=3600.0)), (256, True))
+        # receive == replay with a stalled receiver must fall back to the lag bound
+        self.assertEqual(Solution.replicaVerdict(replicaRow(streaming=False, lag=3600.0)), (256, False))
+        self.assertEqual(Solution.replicaVerdict(replicaRow(streaming=False, lag=2.0)), (256, True))
+        self.assertEqual(Solution.replicaVerdict(replicaRow(caughtUp=False, lag=None)), (256, False))
+        self.assertEqual(Solution.replicaVerdict(replicaRow(inRecovery=False, streaming=False)), (256, True))
+
+    def test_no_replicas_uses_primary(self):
+        self.assertEqual(Solution.routeReadConnection().name, "primary")
+
+    def test_round_robin(self):
+        first, _ = self.replica("first", replicaRow())
+        second, _ = self.replica("second", replicaRow())
+        Solution.configureReadReplicas([first, second])
+        names = [Solution.routeReadConnection().name for _ in range(4)]
+        self.assertEqual(names, ["first", "second", "first", "second"])
+
+    def test_lagging_replica_falls_back_to_primary(self):
+        factory, connections = self.replica("replica", replicaRow(streaming=False, lag=60.0))
+        Solution.configureReadReplicas([factory], maxLag=5, checkInterval=60)
+        self.assertEqual(Solution.routeReadConnection().name, "primary")
+        self.assertTrue(connections[0].closed)
+        # the cached verdict skips the replica without connecting again
+        self.assertEqual(Solution.routeReadConnection().name, "primary")
+        self.assertEqual(len(connections), 1)
+
+    def test_lag_check_is_cached(self):
+        factory, connections = self.replica("replica", replicaRow())
+        Solution.configureReadReplicas([factory], maxLag=5, checkInterval=60)
+        Solution.routeReadConnection()
+        Solution.routeReadConnection()
+        self.assertEqual([connection.checks for connection in connections], [1, 0])
+
+    def test_read_your_writes(self):
+        factory, _ = self.replica("replica", replicaRow(replayed="0/100"))
+        Solution.configureReadReplicas([factory], checkInterval=60)
+        Solution.session.writeLSN = Solution.parseLSN("0/200")
+        self.assertIsNone(Solution.cachedReplicaReady(0))
+        self.assertEqual(Solution.routeReadConnection().name, "primary")
+        Solution.session.writeLSN = Solution.parseLSN("0/100")
+        self.assertEqual(Solution.routeReadConnection().name, "replica")
+
+    def test_broken_replica_is_recorded(self):
+        def broken():
+            raise RuntimeError("could not connect")
+        Solution.configureReadReplicas([broken])
+        self.assertEqual(Solution.routeReadConnection().name, "primary")
+        self.assertIsInstance(Solution.replicaErrors[0], RuntimeError)
+
+    def test_dsn_becomes_factory(self):
+        Solution.configureReadReplicas(["host=localhost port=5433 dbname=test"])
+        self.assertEqual(Solution.readReplicas[0].func, Solution.ReplicaConnector)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+import os
+import struct
+import tempfile
+import unittest
+
+import Solution
+
+
+def copyStream(rows) -> bytes:
+    # builds a PGCOPY binary stream for rows of ints and strs
+    parts = [Solution.COPY_SIGNATURE + struct.pack("!ii", 0, 0)]
+    for row in rows:
+        parts.append(struct.pack("!h", len(row)))
+        for value in row:
+            field = struct.pack("!i", value) if isinstance(value, int) else value.encode("utf-8")
+            parts.append(struct.pack("!i", len(field)) + field)
+    parts.append(struct.pack("!h", -1))
+    return b"".join(parts)
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.rows = {
+            "files": [(1, "pdf", 10), (2, "txt", -5), (3, "pdf", 2147483647)],
+            "disks": [(7, "DELL", 10, 100, 3)],
+            "rams": [],
+            "saved_files": [(1, 7), (3, 7)],
+            "disks_ram_enhanced": [],
+        }
+
+    def export(self):
+        for table, columns in Solution.SNAPSHOT_TABLES.items():
+            path = os.path.join(self.directory, table + ".copy")
+            with open(path, "wb") as f:
+                f.write(copyStream(self.rows[table]))
+            with open(path, "rb") as f:
+                rows = Solution.writeColumns(f, self.directory, table, columns)
+            self.assertEqual(rows, len(self.rows[table]))
+
+    def test_round_trip(self):
+        self.export()
+        snapshot = Solution.loadSnapshot(self.directory)
+        files = snapshot["files"]
+        self.assertEqual(files["rows"], 3)
+        self.assertEqual(list(files["columns"]["file_id"]), [1, 2, 3])
+        self.assertEqual(list(files["columns"]["size"]), [10, -5, 2147483647])
+        types = files["dictionaries"]["type"]
+        self.assertEqual([types[code] for code in files["columns"]["type"]], ["pdf", "txt", "pdf"])
+        self.assertEqual(list(snapshot["saved_files"]["columns"]["disk_id"]), [7, 7])
+        self.assertEqual(snapshot["disks"]["dictionaries"]["manufacturing_company"], ["DELL"])
+
+    def test_empty_table(self):
+        self.export()
+        rams = Solution.loadSnapshot(self.directory)["rams"]
+        self.assertEqual(rams["rows"], 0)
+        self.assertEqual(len(rams["columns"]["ram_id"]), 0)
+        self.assertEqual(rams["dictionaries"]["company"], [])
+
+    def test_bad_signature(self):
+        path = os.path.join(self.directory, "bad.copy")
+        with open(path, "wb") as f:
+            f.write(b"not a copy stream at all")
+        with open(path, "rb") as f:
+            with self.assertRaises(ValueError):
+                list(Solution.readCopyRows(f))
+
+    def test_null_field(self):
+        path = os.path.join(self.directory, "null.copy")
+        with open(path, "wb") as f:
+            f.write(Solution.COPY_SIGNATURE + struct.pack("!ii", 0, 0)
+                    + struct.pack("!hi", 1, -1) + struct.pack("!h", -1))
+        with open(path, "rb") as f:
+            with self.assertRaises(ValueError):
+                list(Solution.readCopyRows(f))
+
+
+
+class FakeCursor:
+    def __init__(self, data, chunk=7):
+        self.data = data
+        self.chunk = chunk
+
+    def copy_expert(self, query, file):
+        for start in range(0, len(self.data), self.chunk):
+            file.write(self.data[start:start + self.chunk])
+
+
+class FakeConnection:
+    def __init__(self, data, chunk=7):
+        self.cursor = FakeCursor(data, chunk)
+
+
+class TestStreamColumns(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.columns = Solution.SNAPSHOT_TABLES["saved_files"]
+
+    def test_streams_in_small_chunks(self):
+        conn = FakeConnection(copyStream([(1, 7), (2, 8), (3, 9)]))
+        rows = Solution.streamColumns(conn, "COPY", self.directory, "saved_files", self.columns)
+        self.assertEqual(rows, 3)
+        with open(os.path.join(self.directory, "saved_files.disk_id.i4"), "rb") as f:
+            self.assertEqual(struct.unpack("<3i", f.read()), (7, 8, 9))
+
+    def test_larger_than_pipe_buffer(self):
+        rows = [(i, i % 13) for i in range(1, 50001)]
+        conn = FakeConnection(copyStream(rows), chunk=8192)
+        self.assertEqual(Solution.streamColumns(conn, "COPY", self.directory, "saved_files", self.columns),
+                         len(rows))
+
+    def test_truncated_stream_raises(self):
+        conn = FakeConnection(copyStream([(1, 7), (2, 8)])[:-5])
+        with self.assertRaises(Exception):
+            Solution.streamColumns(conn, "COPY", self.directory, "saved_files", self.columns)
+
+
+if __name__ == "__main__":
+    unittest.main()